@@ -0,0 +1,445 @@
+"""
+Download + parse pipeline shared by app.py, v1.py and v2.py, so the three
+UIs use one connection pool and one cached DataFrame.
+"""
+import streamlit as st
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import html
+import re
+import time
+import unicodedata
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from requests_cache import CachedSession
+
+# -----------------------------
+# LOAD SECRETS
+# -----------------------------
+BASE_URL = st.secrets["TELEGRAM_BASE_URL"]
+START_POST = int(st.secrets["START_POST"])
+END_POST = int(st.secrets["END_POST"])
+MAX_THREADS = 32  # concurrent downloads (I/O-bound, threads idle on sockets)
+
+# HTTP responses and parsed results are persisted here so a server restart
+# doesn't re-scrape
+CACHE_DIR = Path(".cache")
+CACHE_DIR.mkdir(exist_ok=True)
+
+# how long a scrape is reused (seconds): the DataFrame in memory and on disk,
+# and the downloaded pages of the newest posts, so edits and new posts show
+# up within it
+CACHE_TTL = 3600
+
+# pages of older posts (all but the last RECENT_POSTS ids of the range) are
+# rarely edited any more, so they're kept for a day and a re-scrape only
+# downloads the recent end of the range
+RECENT_POSTS = 50
+OLD_POST_TTL = 24 * 3600
+
+# -----------------------------
+# HTTP SESSION (keep-alive)
+# -----------------------------
+# One pooled session for every download, so posts reuse the same
+# TCP/TLS connections to Telegram instead of reconnecting per post.
+# Responses are cached on disk (for CACHE_TTL or OLD_POST_TTL, chosen per
+# request in scrape_jobs_concurrent), so a re-scrape only fetches posts that
+# aren't cached yet. Only pages that look like ads are stored: missing,
+# deleted or not-yet-published ids are fetched again every time.
+# st.cache_resource keeps a single instance for the whole server (across
+# reruns, sessions and module reloads) instead of reopening the pool.
+def is_ad_page(response) -> bool:
+    return b"og:description" in response.content and "מודעה".encode() in response.content
+
+@st.cache_resource
+def get_session() -> CachedSession:
+    session = CachedSession(
+        str(CACHE_DIR / "http_cache"), backend="sqlite",
+        expire_after=CACHE_TTL, filter_fn=is_ad_page,
+    )
+    session.headers.update({"User-Agent": "Mozilla/5.0"})
+    adapter = HTTPAdapter(
+        pool_connections=MAX_THREADS,
+        pool_maxsize=MAX_THREADS,
+        max_retries=Retry(total=2, backoff_factor=0.3),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# -----------------------------
+# OG:DESCRIPTION META TAG
+# -----------------------------
+# The post text is the only thing we need from the page, so pull the
+# <meta property="og:description"> content directly instead of building a DOM.
+# It runs on the raw response bytes (either quote style, other attributes
+# allowed anywhere, property and content in either order: the lookahead
+# only checks the tag is og:description); only the captured content is decoded.
+OG_DESCRIPTION_RE = re.compile(
+    rb'<meta(?=[^>]*?\sproperty=(["\'])og:description\1)[^>]*?\scontent=(["\'])(.*?)\2',
+    re.I | re.S,
+)
+
+# -----------------------------
+# NORMALIZE HEBREW (for fuzzy search)
+# -----------------------------
+QUOTE_CHARS = "״\"'"
+# deletes all three quote characters in a single pass
+QUOTES_TABLE = str.maketrans("", "", QUOTE_CHARS)
+
+def normalize_hebrew(text: str) -> str:
+    """
+    1) NFKC normalization
+    2) Remove quotes (״, ", ')
+    """
+    return unicodedata.normalize('NFKC', text).translate(QUOTES_TABLE)
+
+# -----------------------------
+# PARSE SERVICE PERIOD MONTHS
+# -----------------------------
+SERVICE_PERIOD_RE = re.compile(r"^\s*(\S+)\s*-\s*(\S+)\s*$")
+
+def parse_service_period(text: str) -> (str, str):
+    """
+    If text looks like "מרץ - אפריל", return ("מרץ", "אפריל").
+    Otherwise ("", "").
+    """
+    text = text.strip()
+    match = SERVICE_PERIOD_RE.search(text)
+    if match:
+        return match.group(1), match.group(2)
+    return "", ""
+
+# -----------------------------
+# PARSE P'TOR / MAAGAR
+# -----------------------------
+# Regex for a line containing either '⛔' or '🖐🏻', plus 'פטור' or 'מאגר',
+# near the end, just before "לפרטים נוספים והגשת מועמדות" or a dashed line.
+EXEMPT_LINE_RE = re.compile(r"[⛔🖐🏻].*?(?:פטור|מאגר).*")
+
+# every phrase the decision below looks at, in one alternation. The longer
+# "not relevant for ptor" phrase comes first so it wins over the phrases it
+# contains; it also counts as "לא רלוונטי" for the maagar check.
+EXEMPT_PHRASES_RE = re.compile(
+    r'(?P<not_ptor>לא רלוונטי לבעלי "פטור")'
+    r'|(?P<ptor>לבעלי "פטור")'
+    r'|(?P<not_ptor_note>\(לא פטור!\))'
+    r'|(?P<not_relevant>לא רלוונטי)'
+    r'|(?P<maagar>משוייכים ל"מאגר")'
+)
+
+def parse_exempt_line(text: str):
+    """
+    Look for a line that starts with either ⛔ or 🖐🏻 and references פטור or מאגר.
+    We'll return two booleans: (relevant_ptor, relevant_maagar),
+    which can be True/False or None if unknown.
+    """
+    # We'll just find the FIRST occurrence with "⛔" or "🖐🏻" that mentions 'פטור' or 'מאגר'.
+    match = EXEMPT_LINE_RE.search(text)
+    if not match:
+        return (None, None)  # Not found => no info
+
+    # One scan of the line collects which phrases it contains
+    found = {m.lastgroup for m in EXEMPT_PHRASES_RE.finditer(match.group(0))}
+
+    # Start by defaulting to None
+    ptor = None
+    maagar = None
+
+    # ---- Check P'TOR ----
+    # "לא רלוונטי לבעלי \"פטור\"" => ptor=False
+    # "רלוונטי גם לבעלי \"פטור\"" => ptor=True
+    # "(לא פטור!)" => ptor=False (explicitly says not ptor)
+    if "not_ptor" in found or "not_ptor_note" in found:
+        ptor = False
+    elif "ptor" in found:
+        # e.g. "רלוונטי גם לבעלי \"פטור\"" or "מתאים לבעלי \"פטור\""
+        ptor = True
+
+    # ---- Check MA'AGAR ----
+    # "לא רלוונטי למשוייכים ל\"מאגר\"" => maagar=False
+    # "משוייכים ל\"מאגר\"" => maagar=True
+    # or if line includes "למשוייכים ל\"מאגר\" (לא פטור!)" => maagar=True, ptor=False
+    if "maagar" in found:
+        if "not_relevant" in found or "not_ptor" in found:
+            maagar = False
+        else:
+            # e.g. "רלוונטי גם לבעלי \"פטור\" / משוייכים ל\"מאגר\""
+            maagar = True
+
+    return (ptor, maagar)
+
+# -----------------------------
+# REGEX PARSING
+# -----------------------------
+AD_NUMBER_RE = re.compile(r"מודעה\s*מספר\s*#(\d+)")
+AD_NUMBER_PREFIX = "מודעה מספר #"
+ROLE_LINE_RE = re.compile(r"\*\*\s*(.+)")
+DASHES_RE = re.compile(r"-+\s*")
+
+# "⬅️ <title>:" sections and inline "<marker>: VALUE" lines read by parse_job_info
+SECTION_TITLES = ("דרושים", "כישורים נדרשים", "פרטים על היחידה", "תנאי שירות")
+# other headings some posts use for the roles section
+SECTION_ALIASES = {"דרוש/ה": "דרושים", "דרוש": "דרושים"}
+INLINE_MARKERS = ("סוג יחידה", "אזור בארץ", "תקופת שירות הקרובה")
+
+# row value used for ads that list no roles
+NO_ROLES = "לא צוינו תפקידים"
+
+# a section title may follow any arrow, but its body only ends at an arrow
+# or a dashed line that starts a new line (an arrow mid-line is body text)
+SECTION_START_RE = re.compile(
+    r"⬅️\s*(" + "|".join(map(re.escape, SECTION_TITLES + tuple(SECTION_ALIASES))) + r")\s*:"
+)
+SECTION_END_RE = re.compile(r"\n(?:⬅️|-+\s)")
+
+# "<marker>:" anywhere on a line; a value runs to the next marker on the same
+# line (e.g. "סוג יחידה: X | אזור בארץ: Y") or to the end of the line
+INLINE_MARKER_RE = re.compile(
+    r"(" + "|".join(map(re.escape, INLINE_MARKERS)) + r")[^\S\n]*:"
+)
+
+def parse_ad_number(text: str) -> str:
+    # the regex can only match at or after the first "מודעה", and posts almost
+    # always spell it with single spaces, so try that with plain str ops first
+    i = text.find("מודעה")
+    if i < 0:
+        return "לא נמצא"
+    if text.startswith(AD_NUMBER_PREFIX, i):
+        start = end = i + len(AD_NUMBER_PREFIX)
+        while end < len(text) and text[end].isdecimal():
+            end += 1
+        if end > start:
+            return text[start:end]
+    match = AD_NUMBER_RE.search(text, i)
+    return match.group(1) if match else "לא נמצא"
+
+def parse_fields(text: str) -> dict:
+    """
+    Walk the post once instead of running a separate search per field.
+    Sections run from "⬅️ <title>:" to the next line starting with an arrow
+    or dashes; inline "<marker>:" values run to the next marker on the same
+    line or the end of the line (or take the next line if empty).
+    Returns {title/marker: raw value} for the first occurrence of each.
+    """
+    fields = {}
+    for match in SECTION_START_RE.finditer(text):
+        title = SECTION_ALIASES.get(match.group(1), match.group(1))
+        if title not in fields:
+            end = SECTION_END_RE.search(text, match.end())
+            fields[title] = text[match.end():end.start() if end else len(text)].strip()
+
+    markers = list(INLINE_MARKER_RE.finditer(text))
+    for i, match in enumerate(markers):
+        marker = match.group(1)
+        if marker in fields:
+            continue
+        line_end = text.find("\n", match.end())
+        if line_end < 0:
+            line_end = len(text)
+        end = line_end
+        if i + 1 < len(markers) and markers[i + 1].start() < line_end:
+            end = markers[i + 1].start()
+        value = text[match.end():end].strip()
+        if not value and end == line_end < len(text):
+            next_end = text.find("\n", line_end + 1)
+            if next_end < 0:
+                next_end = len(text)
+            # an empty marker takes the next line, unless that line holds
+            # another marker (then this field is simply empty)
+            if not (i + 1 < len(markers) and markers[i + 1].start() < next_end):
+                value = text[line_end + 1:next_end].strip()
+        fields[marker] = value
+    return fields
+
+# -----------------------------
+# parse_job_info
+# -----------------------------
+def parse_job_info(post_id: int, html_content: bytes):
+    # Deleted / private / out-of-range posts have no og:description at all;
+    # a plain substring check rejects them before any regex work.
+    if not html_content or b"og:description" not in html_content:
+        return None
+
+    meta_match = OG_DESCRIPTION_RE.search(html_content)
+    if not meta_match:
+        return None
+
+    text_content = html.unescape(meta_match.group(3).decode("utf-8", "replace"))
+
+    # 1) Must have מודעה מספר #XXXX
+    ad_number = parse_ad_number(text_content)
+    if ad_number == "לא נמצא":
+        return None  # skip if no ad number
+
+    # 2) Extract fields (single pass over the text)
+    fields = parse_fields(text_content)
+    sug_yehida = fields.get("סוג יחידה", "")
+    area = fields.get("אזור בארץ", "")
+    roles = [r.strip() for r in ROLE_LINE_RE.findall(fields.get("דרושים", ""))]
+    qualifications = DASHES_RE.sub("", fields.get("כישורים נדרשים", "")).strip()
+    unit_info = DASHES_RE.sub("", fields.get("פרטים על היחידה", "")).strip()
+    service_terms = DASHES_RE.sub("", fields.get("תנאי שירות", "")).strip()
+
+    # 3) Service period
+    service_period_raw = fields.get("תקופת שירות הקרובה", "")
+    month_start, month_end = parse_service_period(service_period_raw)
+
+    # 4) Immediate, recruitment type
+    immediate = "כן" if "⏰" in text_content else "לא"
+    recruitment_type = "זמני או קבוע" if "🔊 זמני או קבוע" in text_content else ""
+
+    # 5) Parse p'tor / maagar
+    ptor_bool, maagar_bool = parse_exempt_line(text_content)
+    # We'll store them as strings "כן" / "לא" / "" for easy filtering
+    if ptor_bool is True:
+        ptor_str = "כן"
+    elif ptor_bool is False:
+        ptor_str = "לא"
+    else:
+        ptor_str = ""  # unknown
+
+    if maagar_bool is True:
+        maagar_str = "כן"
+    elif maagar_bool is False:
+        maagar_str = "לא"
+    else:
+        maagar_str = ""  # unknown
+
+    if not roles:
+        roles = [NO_ROLES]
+
+    # One list per column (one entry per role), so the scraper can extend
+    # whole columns instead of building a dict per row
+    n = len(roles)
+    return {
+        "מספר מודעה": [ad_number] * n,
+        "תפקיד": roles,
+        "סוג יחידה": [sug_yehida] * n,
+        "אזור בארץ": [area] * n,
+        "כישורים נדרשים": [qualifications] * n,
+        "פרטים על היחידה": [unit_info] * n,
+        "תנאי שירות": [service_terms] * n,
+        "תקופת שירות (Raw)": [service_period_raw] * n,
+        "חודש התחלה": [month_start] * n,
+        "חודש סיום": [month_end] * n,
+        "גיוס מיידי": [immediate] * n,
+        "סוג גיוס": [recruitment_type] * n,
+        # new fields for פטור / מאגר
+        "מתאים לבעלי פטור": [ptor_str] * n,
+        "מתאים למשוייכים למאגר": [maagar_str] * n,
+        "קישור": [f"{BASE_URL}{post_id}"] * n,
+    }
+
+# -----------------------------
+# DOWNLOAD HTML
+# -----------------------------
+def download_html(session: requests.Session, post_id: int, expire_after: int = CACHE_TTL):
+    url = f"{BASE_URL}{post_id}"
+    try:
+        resp = session.get(url, timeout=5, expire_after=expire_after)
+        if resp.status_code == 200:
+            return post_id, resp.content
+    except requests.exceptions.RequestException:
+        pass
+    return post_id, None
+
+def fetch_and_parse(session: requests.Session, post_id: int, expire_after: int = CACHE_TTL):
+    # parse right after the download so the page's HTML is freed immediately
+    # instead of every page being held until the whole range is fetched
+    return parse_job_info(*download_html(session, post_id, expire_after))
+
+# -----------------------------
+# SCRAPE (Multithread)
+# -----------------------------
+# fixed column order of the scraped frame (also keeps an empty scrape well-formed)
+COLUMNS = (
+    "מספר מודעה", "תפקיד", "סוג יחידה", "אזור בארץ", "כישורים נדרשים",
+    "פרטים על היחידה", "תנאי שירות", "תקופת שירות (Raw)", "חודש התחלה",
+    "חודש סיום", "גיוס מיידי", "סוג גיוס", "מתאים לבעלי פטור",
+    "מתאים למשוייכים למאגר", "קישור",
+)
+
+# low-cardinality columns stored as pandas categoricals (categories come out
+# deduplicated and sorted, which is what the dropdowns need)
+CATEGORY_COLUMNS = (
+    "אזור בארץ", "סוג יחידה", "גיוס מיידי", "סוג גיוס", "חודש התחלה",
+    "חודש סיום", "מתאים לבעלי פטור", "מתאים למשוייכים למאגר",
+)
+
+# part of the Parquet file name; bump it whenever the frame's columns change
+# so files written by an older version aren't read back
+CACHE_VERSION = 3
+
+# cache_resource hands every rerun the same DataFrame instead of unpickling a
+# fresh copy each time, so callers must only read it (filter into new frames,
+# never assign columns or modify it in place)
+@st.cache_resource(ttl=CACHE_TTL, show_spinner=False)  # the caller shows its own spinner
+def scrape_jobs_concurrent(start_id: int, end_id: int) -> pd.DataFrame:
+    # the Parquet copy only survives restarts for the same TTL as the memory
+    # cache, otherwise new posts would never be picked up
+    cache_path = CACHE_DIR / f"jobs_v{CACHE_VERSION}_{start_id}_{end_id}.parquet"
+    if cache_path.exists() and time.time() - cache_path.stat().st_mtime < CACHE_TTL:
+        df = pd.read_parquet(cache_path)
+        # Parquet doesn't keep the Arrow storage of the string dtype, so restore
+        # it or substring search falls back to the Python-backed string kernels
+        df["_search_blob"] = df["_search_blob"].astype("string[pyarrow]")
+        return df
+
+    # handle posts as they finish (not in submission order) so the progress
+    # bar moves; results are put back in post order afterwards
+    post_ids = range(start_id, end_id+1)
+    results = {}
+    # looked up here, on the script thread, and handed to the workers
+    session = get_session()
+    # elements sent inside a cached function are recorded and replayed on every
+    # cache hit, so the bar is only updated when the whole percent changes
+    # (at most ~100 messages) rather than once per post
+    progress = st.progress(0.0)
+    percent = 0
+    recent_from = end_id - RECENT_POSTS
+    with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
+        futures = {
+            executor.submit(
+                fetch_and_parse, session, post_id,
+                CACHE_TTL if post_id > recent_from else OLD_POST_TTL,
+            ): post_id
+            for post_id in post_ids
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if done * 100 // len(futures) != percent:
+                percent = done * 100 // len(futures)
+                progress.progress(percent / 100)
+    progress.empty()
+
+    columns = defaultdict(list)
+    for post_id in post_ids:
+        parsed = results[post_id]
+        if parsed:
+            for col, values in parsed.items():
+                columns[col].extend(values)
+
+    df = pd.DataFrame(columns, columns=list(COLUMNS))
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype("category")
+
+    # every field of a row joined, normalized and lowercased once here, so a
+    # search only has to normalize the query. Same steps as normalize_hebrew
+    # + lower(), but as Arrow compute kernels over whole columns rather than
+    # Python calls per row; kept Arrow-backed so substring search runs in
+    # Arrow's C++ kernel too
+    blob = pc.binary_join_element_wise(
+        *(pa.array(df[col].astype(str), type=pa.string()) for col in COLUMNS), " "
+    )
+    blob = pc.utf8_normalize(blob, form="NFKC")
+    blob = pc.replace_substring_regex(blob, pattern=f"[{QUOTE_CHARS}]", replacement="")
+    df["_search_blob"] = pd.arrays.ArrowStringArray(pc.utf8_lower(blob))
+
+    df.to_parquet(cache_path, compression="zstd")
+    return df
@@ -1,17 +1,8 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-import re
-import pandas as pd
-import time
-from fuzzywuzzy import process
-from concurrent.futures import ThreadPoolExecutor
+from rapidfuzz import fuzz, process, utils
 
-# Load secrets from Streamlit secrets.toml
-BASE_URL = st.secrets["TELEGRAM_BASE_URL"]
-START_POST = int(st.secrets["START_POST"])
-END_POST = int(st.secrets["END_POST"])
-MAX_THREADS = 10  # Number of concurrent requests
+# Download, parse and caching are shared with app.py / v2.py
+from scraper import START_POST, END_POST, CACHE_TTL, NO_ROLES, scrape_jobs_concurrent
 
 # Set page config
 st.set_page_config(page_title="📌 חיפוש הזדמנויות גיוס", page_icon="🔍", layout="wide")
@@ -29,78 +20,23 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# Function to download the HTML from a Telegram post
-def download_html(post_id):
-    """Downloads HTML from a given post ID and returns the content."""
-    url = f"{BASE_URL}{post_id}"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    
-    try:
-        response = requests.get(url, headers=headers, timeout=5)
-        if response.status_code == 200:
-            return post_id, response.text
-    except requests.exceptions.RequestException:
-        return post_id, None
-    return post_id, None
-
-# Function to parse job ad details
-def parse_job_info(post_id, html_content):
-    """Parses job ad number and multiple roles from the HTML content."""
-    if not html_content:
-        return None
-    
-    try:
-        soup = BeautifulSoup(html_content, "html.parser")
-        meta_desc = soup.find("meta", {"property": "og:description"})
-        if not meta_desc:
-            return None
-
-        text_content = meta_desc["content"]
-
-        # Extract job ad number
-        ad_number_match = re.search(r"מודעה מספר #(\d+)", text_content)
-        ad_number = ad_number_match.group(1) if ad_number_match else "לא נמצא"
-
-        # Extract roles
-        roles_section_match = re.search(r"(?:דרושים|דרוש|דרוש/ה)[^\n]*\n((?:\*\* .+\n)+)", text_content)
-        roles = []
-        if roles_section_match:
-            roles_section = roles_section_match.group(1)
-            roles = re.findall(r"\*\* (.+)", roles_section)
-
-        return [(ad_number, role, f"{BASE_URL}{post_id}") for role in roles]
-
-    except Exception as e:
-        return None
-
-# Function to scrape multiple job posts concurrently
-@st.cache_data  # Efficient caching
-def scrape_jobs_concurrent(start, end):
-    """Scrapes job posts using multithreading and returns a DataFrame."""
-    data = []
-    
-    # Step 1: Download all pages concurrently
-    with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-        html_results = list(executor.map(download_html, range(start, end + 1)))
-
-    # Step 2: Parse job data concurrently
-    with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-        parsed_results = list(executor.map(lambda x: parse_job_info(x[0], x[1]), html_results))
-
-    # Step 3: Flatten results and create DataFrame
-    for result in parsed_results:
-        if result:
-            data.extend(result)
-
-    df = pd.DataFrame(data, columns=["מספר מודעה", "תפקיד", "קישור"])
-    return df
+# Build the role corpus once per scrape instead of on every search keystroke; keyed on the
+# post range (cheap to hash) and returned by reference, not hashed/copied per rerun
+@st.cache_resource(ttl=CACHE_TTL, show_spinner=False)
+def load_roles(start, end):
+    """Returns the rows that list roles, their roles, and the roles after rapidfuzz's default_process."""
+    df = scrape_jobs_concurrent(start, end)
+    # Only ads that actually list roles are searchable here (no placeholder rows)
+    df = df[df["תפקיד"] != NO_ROLES]
+    roles = df["תפקיד"].tolist()
+    return df, roles, [utils.default_process(role) for role in roles]
 
 # --- UI ---
 st.title("📌 חיפוש הזדמנויות גיוס")
 
 # Show loading spinner while scraping
 with st.spinner("🔄 טוען משרות חדשות..."):
-    df = scrape_jobs_concurrent(START_POST, END_POST)
+    df, roles, processed_roles = load_roles(START_POST, END_POST)
 
 st.success("✅ כל המשרות נטענו בהצלחה!")
 
@@ -109,17 +45,30 @@ st.header("🔍 חפש תפקידים")
 search_query = st.text_input("הכנס שם תפקיד:", "")
 
 if search_query:
-    search_results = process.extract(search_query, df["תפקיד"].tolist(), limit=5)
-    matched_roles = [match[0] for match in search_results if match[1] > 50]
+    # Choices are already preprocessed, so only the query is processed here;
+    # score_cutoff prunes weak candidates inside rapidfuzz instead of filtering afterwards
+    search_results = process.extract(
+        utils.default_process(search_query),
+        processed_roles,
+        scorer=fuzz.WRatio,
+        processor=None,
+        limit=5,
+        score_cutoff=50,
+    )
+    matched_roles = [roles[idx] for _, _, idx in search_results]
 
     if matched_roles:
         st.write(f"🎯 **התוצאות הטובות ביותר עבור '{search_query}':**")
         filtered_df = df[df["תפקיד"].isin(matched_roles)]
-        
-        for _, row in filtered_df.iterrows():
-            with st.expander(f"📌 {row['תפקיד']}"):
-                st.write(f"🔢 **מספר מודעה:** {row['מספר מודעה']}")
-                st.write(f"🔗 **[פרטי המודעה ופניה למגייס]({row['קישור']})**")
+
+        # One table instead of an expander (and two writes) per matching row
+        st.dataframe(
+            filtered_df[["תפקיד", "מספר מודעה", "קישור"]],
+            column_config={
+                "קישור": st.column_config.LinkColumn("קישור", display_text="🔗 פרטי המודעה ופניה למגייס"),
+            },
+            hide_index=True,
+        )
 
     else:
         st.warning("❌ לא נמצאו תפקידים תואמים.")